@@ -1,11 +1,73 @@
 from fastapi import FastAPI, HTTPException
 import httpx
-from bs4 import BeautifulSoup
+from async_lru import alru_cache
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve as sv
 import re
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
 
+# Shared HTTP client, created on startup so connections are pooled, kept alive
+# and multiplexed over HTTP/2 where the origin supports it
+CLIENT: httpx.AsyncClient | None = None
+
+# Patterns used on every request, compiled once at import. The bytes pattern scans the
+# stream; its \s only covers ASCII whitespace, so each candidate is re-checked with the
+# str pattern to also stop at Unicode whitespace such as U+00A0
+_FINAL_URL_RE = re.compile(rb'https?://linkedmoviehub\.top[^\s\'"]+')
+_FINAL_URL_TEXT_RE = re.compile(r'https?://linkedmoviehub\.top[^\s\'"]+')
+
+# Only build the parts of each page that the endpoints actually query
+_SEARCH_STRAINER = SoupStrainer(class_='result-item')
+_MOVIE_PAGE_STRAINER = SoupStrainer(['tr', 'a'])  # 'a' keeps the parent of button.downbtn
+_FINAL_PAGE_STRAINER = SoupStrainer(['div', 'center'])
+
+# CSS selectors, compiled once instead of on every call
+_SEL_RESULT_ITEM = sv.compile('.result-item')
+_SEL_LINK_ROWS = sv.compile("tr[id^='link-']")
+_SEL_LINK_ANCHOR = sv.compile("a[href*='/links/']")
+_SEL_DOWN_BUTTON = sv.compile('button.downbtn')
+_SEL_QUALITY_DIV = sv.compile('div.quality')
+
+# Highest quality tier the site offers (2160p)
+MAX_KNOWN_QUALITY = 2160
+
+# Parsed link pages are cached per URL; failures are never cached
+LINK_CACHE_SIZE = 1024
+LINK_CACHE_TTL = 300  # seconds
+
+# Intermediate pages are streamed in chunks; only a short tail is kept between them
+STREAM_CHUNK_SIZE = 65536
+STREAM_TAIL_SIZE = 8192
+
+# Raw page bodies keyed by (method, url), kept briefly so repeat requests skip the network
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = 60  # seconds
+_RESPONSE_CACHE: OrderedDict[tuple[str, str], tuple[float, int, str]] = OrderedDict()
+
+# Placeholder values, interned so every result shares one object
+NO_YEAR = sys.intern("N/A")
+UNKNOWN = sys.intern("Unknown")
+
+# The link helpers return (result, None) on success and (None, reason) on a miss;
+# the reason becomes the 404 detail
+FetchResult = tuple[dict | None, str | None]
+MISSING_DOWNLOAD_LINK = "Download link not found on the page."
+MISSING_FINAL_PAGE_URL = "Final download page URL not found on intermediate page."
+MISSING_DOWNLOAD_LINKS = "No download links found"
+
+# Upper bound on movies processed at once by the combined endpoint
+MAX_CONCURRENT_MOVIES = 10
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -14,36 +76,104 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup_client():
+    """Open the shared HTTP client and size the parsing thread pool"""
+    global CLIENT
+    # Parsing runs in the default executor, so size it for a few threads per core
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
+    )
+    CLIENT = httpx.AsyncClient(
+        follow_redirects=True,
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=30.0,
+    )
+
+@app.on_event("shutdown")
+async def shutdown_client():
+    """Close the shared HTTP client"""
+    if CLIENT is not None:
+        await CLIENT.aclose()
+
+def _parse(html: str, strainer: SoupStrainer) -> BeautifulSoup:
+    """Parse the strained parts of a page; called via asyncio.to_thread to keep the event loop free."""
+    return BeautifulSoup(html, 'lxml', parse_only=strainer)
+
+async def cached_get(url: str) -> httpx.Response:
+    """GET a page with the shared client, reusing a recent successful response body."""
+    key = ('GET', url)
+    now = time.monotonic()
+    entry = _RESPONSE_CACHE.get(key)
+    if entry is not None:
+        expiry, status_code, text = entry
+        if expiry > now:
+            _RESPONSE_CACHE.move_to_end(key)
+            return httpx.Response(status_code, text=text, request=httpx.Request('GET', url))
+        del _RESPONSE_CACHE[key]
+
+    response = await CLIENT.get(url)
+    # Only the status and text are kept so no Response (or its connection) outlives the request
+    if response.is_success:
+        _RESPONSE_CACHE[key] = (now + RESPONSE_CACHE_TTL, response.status_code, response.text)
+        _RESPONSE_CACHE.move_to_end(key)
+        if len(_RESPONSE_CACHE) > RESPONSE_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+    return response
+
+@dataclass(slots=True)
+class SearchResult:
+    """One movie from the search page."""
+    title: str
+    url: str
+    year: str
+    type: str
+    description: str
+    thumbnail: str
+
+def _build_result(item) -> SearchResult | None:
+    """Build a SearchResult from a .result-item tag, or None if it has no title link."""
+    title_div = item.find(class_='title')
+    title_tag = title_div.find('a') if title_div else None
+    if not title_tag:
+        return None
+
+    # Look up each field once and reuse the tag
+    year_tag = item.find(class_='year')
+    movies_tag = item.find(class_='movies')
+    desc_parent = item.find(class_='contenido')
+    desc_tag = desc_parent.find('p') if desc_parent else None
+    img_tag = item.find('img')
+
+    return SearchResult(
+        title=title_tag.get_text(strip=True),
+        url=title_tag['href'],
+        year=year_tag.get_text(strip=True) if year_tag else NO_YEAR,
+        type=movies_tag.get_text(strip=True) if movies_tag else UNKNOWN,
+        description=desc_tag.get_text(strip=True) if desc_tag else "",
+        thumbnail=img_tag['src'] if img_tag else ""
+    )
+
 @app.get("/api/search")
 async def search_movies(query: str):
     """Step 1: Search for movies on MovieLinkHub"""
     try:
-        async with httpx.AsyncClient() as client:
-            # Search for the movie
-            search_url = f"https://movielinkhub.fun/?s={query}"
-            response = await client.get(search_url)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Extract search results
-            results = []
-            for item in soup.select('.result-item'):
-                title_tag = item.select_one('.title a')
-                if not title_tag:
-                    continue
-
-                result = {
-                    "title": title_tag.get_text(strip=True),
-                    "url": title_tag['href'],
-                    "year": item.select_one('.year').get_text(strip=True) if item.select_one('.year') else "N/A",
-                    "type": item.select_one('.movies').get_text(strip=True) if item.select_one('.movies') else "Unknown",
-                    "description": item.select_one('.contenido p').get_text(strip=True) if item.select_one('.contenido p') else "",
-                    "thumbnail": item.select_one('img')['src'] if item.select_one('img') else ""
-                }
-                results.append(result)
-
-            return {"query": query, "results": results}
+        # Search for the movie
+        search_url = f"https://movielinkhub.fun/?s={query}"
+        response = await cached_get(search_url)
+        response.raise_for_status()
+
+        soup = await asyncio.to_thread(_parse, response.text, _SEARCH_STRAINER)
+
+        # Extract search results, skipping items without a title link
+        results = [
+            result
+            for item in _SEL_RESULT_ITEM.select(soup)
+            if (result := _build_result(item)) is not None
+        ]
+
+        return {"query": query, "results": results}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -52,130 +182,235 @@ def parse_quality(quality_str: str) -> int:
     """Parses a quality string (e.g., '1080p') into an integer."""
     if not quality_str:
         return 0
-    match = re.search(r'(\d+)', quality_str)
-    if match:
-        return int(match.group(1))
-    return 0
+    # Scan for the first run of digits; isdecimal() matches what \d does
+    length = len(quality_str)
+    start = 0
+    while start < length and not quality_str[start].isdecimal():
+        start += 1
+    end = start
+    while end < length and quality_str[end].isdecimal():
+        end += 1
+    return int(quality_str[start:end]) if end > start else 0
+
+def _scan_final_url(buffer: bytearray, encoding: str, complete: bool) -> str | None:
+    """Find the first final URL in buffer, giving what the str pattern would on the decoded text."""
+    pos = 0
+    while match := _FINAL_URL_RE.search(buffer, pos):
+        # A match touching the end of the buffer may continue in the next chunk
+        if not complete and match.end() == len(buffer):
+            return None
+        # The bytes \s misses Unicode whitespace, so a candidate like ".top\xa0" passes here
+        # but not as text; such candidates are skipped and the scan carries on past them
+        text_match = _FINAL_URL_TEXT_RE.match(match.group(0).decode(encoding, errors='replace'))
+        if text_match:
+            return text_match.group(0)
+        pos = match.start() + 1
+    return None
+
+async def _find_final_url(response: httpx.Response) -> str | None:
+    """Scan a streamed response for the final redirect URL from the script or meta tag."""
+    encoding = response.charset_encoding or 'utf-8'
+    buffer = bytearray()
+    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+        buffer += chunk
+        final_url = _scan_final_url(buffer, encoding, complete=False)
+        if final_url:
+            return final_url
+        # Everything before the tail has been searched, so only the tail can hold a partial URL
+        if len(buffer) > STREAM_TAIL_SIZE:
+            del buffer[:-STREAM_TAIL_SIZE]
+    return _scan_final_url(buffer, encoding, complete=True)
+
+async def _fetch_uncached_misses(fetch: Callable[[str], Awaitable[FetchResult]], url: str) -> FetchResult:
+    """Await a cached fetch helper, evicting the entry when it found nothing."""
+    result, reason = await fetch(url)
+    if result is None:
+        fetch.cache_invalidate(url)
+    return result, reason
+
+@alru_cache(maxsize=LINK_CACHE_SIZE, ttl=LINK_CACHE_TTL)
+async def _fetch_download_links(url: str) -> FetchResult:
+    """Fetch a movie page and its intermediate page, cached per URL."""
+    # Get the movie page
+    response = await cached_get(url)
+    response.raise_for_status()
+    soup = await asyncio.to_thread(_parse, response.text, _MOVIE_PAGE_STRAINER)
+
+    # Find all download link sections and select the best quality
+    best_link = None
+    max_quality = -1
+    best_block = None
+
+    for block in _SEL_LINK_ROWS.select(soup):
+        quality_tag = block.find(class_='qua')
+        quality_text = quality_tag.get_text(strip=True) if quality_tag else ""
+        current_quality = parse_quality(quality_text)
+
+        if current_quality > max_quality:
+            link_tag = _SEL_LINK_ANCHOR.select_one(block)
+            if link_tag:
+                max_quality = current_quality
+                best_link = link_tag['href']
+                best_block = block
+                # Nothing ranks above this tier, so stop scanning
+                if max_quality >= MAX_KNOWN_QUALITY:
+                    break
+
+    # Fallback if the primary method fails to find a link
+    if not best_link:
+        button = _SEL_DOWN_BUTTON.select_one(soup)
+        if button:
+            link_tag = button.find_parent('a')
+            if link_tag and link_tag.has_attr('href'):
+                best_link = link_tag['href']
+
+    if not best_link:
+        return None, MISSING_DOWNLOAD_LINK
+
+    # The intermediate page is treated as plain text: it is never parsed into a soup,
+    # only streamed and scanned for the final URL, stopping once it shows up
+    async with CLIENT.stream('GET', best_link) as download_response:
+        download_response.raise_for_status()
+        final_url = await _find_final_url(download_response)
+
+    if not final_url:
+        return None, MISSING_FINAL_PAGE_URL
+
+    # Extract quality, size, and language info from the selected block on the movie page
+    quality_info = {
+        "quality": UNKNOWN,
+        "size": UNKNOWN,
+        "language": UNKNOWN
+    }
+
+    if best_block is not None:
+        # Quality is shown as is; size and language as "[1.2 GB]" and "(Hindi)"
+        for key, class_name, opening, closing in (
+            ("quality", "qua", "", ""),
+            ("size", "siz", "[", "]"),
+            ("language", "lan", "(", ")"),
+        ):
+            info_tag = best_block.find(class_=class_name)
+            text = info_tag.get_text(strip=True) if info_tag else ""
+            text = text.removeprefix(opening).removesuffix(closing).strip()
+            if text:
+                quality_info[key] = text
+
+    return {
+        "intermediate_page_url": best_link,
+        "final_page_url": final_url,
+        "selected_quality_info": quality_info
+    }, None
 
 @app.get("/api/download-links")
 async def get_download_links(url: str):
     """Step 2: Get download links from movie page, selecting the best quality."""
     try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            # Get the movie page
-            response = await client.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Find all download link sections and select the best quality
-            download_blocks = soup.select("tr[id^='link-']")
-            best_link = None
-            max_quality = -1
-            selected_block_html = ""
-
-            for block in download_blocks:
-                quality_tag = block.select_one('.qua')
-                quality_text = quality_tag.get_text(strip=True) if quality_tag else ""
-                current_quality = parse_quality(quality_text)
-
-                if current_quality > max_quality:
-                    link_tag = block.select_one("a[href*='/links/']")
-                    if link_tag:
-                        max_quality = current_quality
-                        best_link = link_tag['href']
-                        selected_block_html = str(block)
-
-            # Fallback if the primary method fails to find a link
-            if not best_link:
-                button = soup.select_one("button.downbtn")
-                if button:
-                    link_tag = button.find_parent('a')
-                    if link_tag and link_tag.has_attr('href'):
-                        best_link = link_tag['href']
-
-            if not best_link:
-                raise HTTPException(status_code=404, detail="Download link not found on the page.")
-
-            download_page_url = best_link
-
-            # Get the intermediate download page
-            download_response = await client.get(download_page_url)
-            download_response.raise_for_status()
-
-            # Extract the final redirect URL from the script or meta tag
-            final_url_match = re.search(r'https?://linkedmoviehub\.top[^\s\'"]+', download_response.text)
-            if not final_url_match:
-                raise HTTPException(status_code=404, detail="Final download page URL not found on intermediate page.")
-            
-            final_url = final_url_match.group(0)
-
-            # Extract quality, size, and language info from the selected block on the movie page
-            quality_info = {
-                "quality": "Unknown",
-                "size": "Unknown",
-                "language": "Unknown"
-            }
-            
-            if selected_block_html:
-                quality_match = re.search(r'class=[\'"]qua[\'"]>([^<]+)', selected_block_html)
-                size_match = re.search(r'class=[\'"]siz[\'"]>\[([^\]]+)', selected_block_html)
-                lang_match = re.search(r'class=[\'"]lan[\'"]>\(([^\)]+)', selected_block_html)
-
-                if quality_match:
-                    quality_info["quality"] = quality_match.group(1).strip()
-                if size_match:
-                    quality_info["size"] = size_match.group(1).strip()
-                if lang_match:
-                    quality_info["language"] = lang_match.group(1).strip()
-
-            return {
-                "intermediate_page_url": download_page_url,
-                "final_page_url": final_url,
-                "selected_quality_info": quality_info
-            }
+        download_page_info, reason = await _fetch_uncached_misses(_fetch_download_links, url)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/final-links")
-async def get_final_download_links(url: str):
-    """Step 3: Get all download options from the final page"""
-    try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            # Get the final download page
-            response = await client.get(url)
-            response.raise_for_status()
+    if download_page_info is None:
+        raise HTTPException(status_code=404, detail=reason)
+    return download_page_info
+
+@alru_cache(maxsize=LINK_CACHE_SIZE, ttl=LINK_CACHE_TTL)
+async def _fetch_final_links(url: str) -> FetchResult:
+    """Fetch and group the links on a final download page, cached per URL."""
+    # Get the final download page
+    response = await cached_get(url)
+    response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+    soup = await asyncio.to_thread(_parse, response.text, _FINAL_PAGE_STRAINER)
 
-            # Organize links by quality
-            quality_sections = {}
+    # Organize links by quality
+    quality_sections = {}
 
-            # Find all quality sections
-            for quality_div in soup.select('div.quality'):
-                quality = quality_div.find('h2').get_text(strip=True)
+    # Find all quality sections
+    for quality_div in _SEL_QUALITY_DIV.select(soup):
+        quality = quality_div.find('h2').get_text(strip=True)
 
-                # Get all download buttons in this section
-                links = []
-                for link in quality_div.find_next('center').select('a.down-btn'):
-                    provider = link.get_text(strip=True)
-                    url = link['href']
-                    links.append({
-                        "provider": provider,
-                        "url": url
-                    })
+        # Get all download buttons in this section; they usually sit in the <center> right after the div
+        center = quality_div.find_next_sibling('center') or quality_div.find_next('center')
+        links = [
+            {
+                "provider": link.get_text(strip=True),
+                "url": link['href']
+            }
+            for link in center.find_all('a', class_='down-btn')
+        ]
 
-                if links:
-                    quality_sections[quality] = links
+        if links:
+            quality_sections[quality] = links
 
-            if not quality_sections:
-                raise HTTPException(status_code=404, detail="No download links found")
+    if not quality_sections:
+        return None, MISSING_DOWNLOAD_LINKS
 
-            return quality_sections
+    return quality_sections, None
+
+@app.get("/api/final-links")
+async def get_final_download_links(url: str):
+    """Step 3: Get all download options from the final page"""
+    try:
+        quality_sections, reason = await _fetch_uncached_misses(_fetch_final_links, url)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if quality_sections is None:
+        raise HTTPException(status_code=404, detail=reason)
+    return quality_sections
+
+async def _process_movie(movie: SearchResult, sem: asyncio.Semaphore):
+    """Run steps 2 and 3 for a single search result, returning None on failure."""
+    movie_url = movie.url
+    if not movie_url:
+        return None
+
+    async with sem:
+        try:
+            # Step 2: movie page -> intermediate page -> final download page URL.
+            # Each hop needs a URL from the previous one, so they stay sequential
+            # here and the overlap comes from running movies side by side.
+            download_page_info, reason = await _fetch_uncached_misses(_fetch_download_links, movie_url)
+            if download_page_info is None:
+                print(f"Failed to process movie '{movie.title}': {reason}")
+                return None
+
+            final_page_url = download_page_info.get("final_page_url")
+            if not final_page_url:
+                return None
+
+            # Step 3: Fetch the final page as soon as its URL is known
+            final_links_by_quality, reason = await _fetch_uncached_misses(_fetch_final_links, final_page_url)
+            if final_links_by_quality is None:
+                print(f"Failed to process movie '{movie.title}': {reason}")
+                return None
+
+        except Exception as e:
+            # If one movie errors, print it and let the others finish
+            print(f"Failed to process movie '{movie.title}': {e}")
+            return None
+
+    # Format the links as requested
+    download_links_formatted = []
+    for quality, links_list in final_links_by_quality.items():
+        urls = [link["url"] for link in links_list]
+        download_links_formatted.append({
+            "quality": quality,
+            "links": urls
+        })
+
+    # Combine all information
+    return {
+        "title": movie.title,
+        "year": movie.year,
+        "type": movie.type,
+        "poster": movie.thumbnail,
+        "downloadLink": download_links_formatted
+    }
+
 @app.get("/api/src")
 async def search_and_get_all_links(query: str):
     """Combined endpoint to search for a movie and get all download links."""
@@ -191,47 +426,12 @@ async def search_and_get_all_links(query: str):
                 "results": []
             }
 
-        final_results = []
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            for movie in search_results:
-                movie_url = movie.get("url")
-                if not movie_url:
-                    continue
-
-                try:
-                    # Step 2: Get the final download page URL
-                    download_page_info = await get_download_links(movie_url)
-                    final_page_url = download_page_info.get("final_page_url")
-
-                    if not final_page_url:
-                        continue
-
-                    # Step 3: Get the final download links
-                    final_links_by_quality = await get_final_download_links(final_page_url)
-
-                    # Format the links as requested
-                    download_links_formatted = []
-                    for quality, links_list in final_links_by_quality.items():
-                        urls = [link["url"] for link in links_list]
-                        download_links_formatted.append({
-                            "quality": quality,
-                            "links": urls
-                        })
-                    
-                    # Combine all information
-                    final_results.append({
-                        "title": movie.get("title"),
-                        "year": movie.get("year"),
-                        "type": movie.get("type"),
-                        "poster": movie.get("thumbnail"),
-                        "downloadLink": download_links_formatted
-                    })
-
-                except HTTPException as e:
-                    # If one movie fails, print an error and continue with the next
-                    print(f"Failed to process movie '{movie.get('title')}': {e.detail}")
-                    continue
-        
+        # Steps 2 and 3 run concurrently per movie, bounded by the semaphore
+        sem = asyncio.Semaphore(MAX_CONCURRENT_MOVIES)
+        tasks = [_process_movie(movie, sem) for movie in search_results]
+        results = await asyncio.gather(*tasks)
+        final_results = [result for result in results if result is not None]
+
         return {
             "ok": True,
             "developer": "Mahir Labib",
@@ -244,4 +444,12 @@ async def search_and_get_all_links(query: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Workers are separate processes, so the module-level caches are per worker
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count() or 2,
+    )